@@ -1,8 +1,15 @@
 from django.contrib import admin
-from .models import Sentence
+from .models import Sentence, PronunciationAttempt
 
 @admin.register(Sentence)
 class SentenceAdmin(admin.ModelAdmin):
-    list_display = ('text', 'difficulty', 'created_at')
+    list_display = ('text', 'difficulty', 'word_count', 'phoneme_count', 'created_at')
     list_filter = ('difficulty', 'created_at')
     search_fields = ('text',)
+
+
+@admin.register(PronunciationAttempt)
+class PronunciationAttemptAdmin(admin.ModelAdmin):
+    list_display = ('reference_text', 'overall_score', 'server_recognition', 'created_at')
+    list_filter = ('server_recognition', 'created_at')
+    search_fields = ('reference_text', 'recognized_text')
@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class PronunciationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pronunciation'
+
+    def ready(self):
+        from .models import Sentence, clear_sentence_id_bounds
+
+        connection_created.connect(enable_sqlite_wal)
+        post_save.connect(clear_sentence_id_bounds, sender=Sentence)
+        post_delete.connect(clear_sentence_id_bounds, sender=Sentence)
+
+
+def enable_sqlite_wal(sender, connection, **kwargs):
+    """Use WAL mode on SQLite so background writes don't block readers."""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL;')
+            cursor.execute('PRAGMA synchronous=NORMAL;')
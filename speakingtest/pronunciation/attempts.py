@@ -0,0 +1,155 @@
+"""Write-behind persistence of pronunciation attempts.
+
+Evaluations must not wait for SQLite, so attempts are only appended to an
+in-memory buffer by the view. A background thread writes them with batched
+bulk_create transactions, either every ATTEMPT_FLUSH_INTERVAL seconds or as
+soon as ATTEMPT_BUFFER_SIZE attempts are waiting. Whatever is left in the
+buffer is written when the process exits.
+
+When the database is unavailable (locked, disk full...) the attempts stay in
+the buffer and flushing backs off, doubling the delay up to max_retry_delay.
+When a batch is rejected because of its data, its attempts are inserted one by
+one and only the ones that fail are logged and dropped, so that they can't
+block the attempts queued behind them.
+"""
+import atexit
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, close_old_connections, connection, transaction
+
+from .models import PronunciationAttempt
+
+# Errors caused by the data of an attempt, retrying won't help. Anything else,
+# like OperationalError for a locked database or a full disk, is retried.
+ROW_ERRORS = (IntegrityError, DataError, TypeError, ValueError)
+
+
+class AttemptBuffer:
+    """Buffer of unsaved attempts flushed to the database by a worker thread."""
+
+    def __init__(self, max_size=50, flush_interval=5.0, max_pending=5000, max_retry_delay=300.0):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.max_retry_delay = max_retry_delay
+        self.retry_delay = 0
+        # Attempts are dropped (oldest first) rather than growing memory
+        # without bound if the database is unavailable for a long time
+        self.pending = deque(maxlen=max_pending)
+        self.lock = threading.Lock()
+        self.flush_requested = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def add(self, attempt):
+        """Queue an attempt for writing, this never touches the database."""
+        with self.lock:
+            if len(self.pending) == self.pending.maxlen:
+                print("Attempt buffer is full, dropping the oldest pronunciation attempt")
+            self.pending.append(attempt)
+            if self.thread is None:
+                self.start()
+            buffer_full = len(self.pending) >= self.max_size
+        if buffer_full and not self.retry_delay:
+            self.flush_requested.set()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='attempt-writer', daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def run(self):
+        while not self.stopping.is_set():
+            self.flush_requested.wait(self.retry_delay or self.flush_interval)
+            self.flush_requested.clear()
+            close_old_connections()
+            self.flush()
+        connection.close()
+
+    def flush(self):
+        """Write all pending attempts in batches, returns the number written."""
+        written = 0
+        while True:
+            with self.lock:
+                batch = [self.pending.popleft() for _ in range(min(self.max_size, len(self.pending)))]
+            if not batch:
+                # Everything was written
+                self.retry_delay = 0
+                break
+            try:
+                with transaction.atomic():
+                    PronunciationAttempt.objects.bulk_create(batch)
+                written += len(batch)
+            except ROW_ERRORS as e:
+                print(f"Error saving pronunciation attempts, saving them one by one: {str(e)}")
+                saved, unsaved = self.save_one_by_one(batch)
+                written += saved
+                if unsaved:
+                    self.database_unavailable(unsaved)
+                    break
+            except Exception as e:
+                print(f"Error saving pronunciation attempts, retrying later: {str(e)}")
+                self.database_unavailable(batch)
+                break
+        return written
+
+    def database_unavailable(self, batch):
+        """Keep the batch for the next flush and back off."""
+        self.requeue(batch)
+        self.retry_delay = min(max(self.retry_delay * 2, self.flush_interval), self.max_retry_delay)
+
+    def requeue(self, batch):
+        with self.lock:
+            free = self.pending.maxlen - len(self.pending)
+            if len(batch) > free:
+                # extendleft() would push the newest pending attempts out
+                print(f"Attempt buffer is full, dropping {len(batch) - free} pronunciation attempts")
+                batch = batch[len(batch) - free:]
+            self.pending.extendleft(reversed(batch))
+
+    def save_one_by_one(self, batch):
+        """Insert attempts separately, dropping the ones with bad data.
+
+        Returns the number saved and the attempts not tried because the
+        database became unavailable.
+        """
+        saved = 0
+        for index, attempt in enumerate(batch):
+            try:
+                with transaction.atomic():
+                    PronunciationAttempt.objects.bulk_create([attempt])
+                saved += 1
+            except ROW_ERRORS as e:
+                print(f"Dropping pronunciation attempt '{attempt.reference_text[:50]}': {str(e)}")
+            except Exception as e:
+                print(f"Error saving pronunciation attempts, retrying later: {str(e)}")
+                return saved, batch[index:]
+        return saved, []
+
+    def stop(self, timeout=10.0):
+        """Stop the writer thread and drain the buffer."""
+        self.stopping.set()
+        self.flush_requested.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        self.flush()
+        if self.pending:
+            print(f"Could not save {len(self.pending)} pronunciation attempts before exiting")
+
+
+attempt_buffer = AttemptBuffer(
+    max_size=getattr(settings, 'ATTEMPT_BUFFER_SIZE', 50),
+    flush_interval=getattr(settings, 'ATTEMPT_FLUSH_INTERVAL', 5.0),
+)
+
+
+def record_attempt(reference_text, recognized_text, overall_score, word_scores, server_recognition=False):
+    """Record the result of an evaluation without blocking the response."""
+    attempt_buffer.add(PronunciationAttempt(
+        reference_text=reference_text,
+        recognized_text=recognized_text or '',
+        overall_score=overall_score,
+        word_scores=word_scores,
+        server_recognition=server_recognition,
+    ))
@@ -3,6 +3,7 @@ import os
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from pronunciation.models import Sentence
+from pronunciation.phonetics import sentence_difficulty, sentence_features
 from django.db import transaction
 
 class Command(BaseCommand):
@@ -53,19 +54,17 @@ class Command(BaseCommand):
                         skipped_count += 1
                         continue
                     
+                    # Compute the phonetic features used for sentence selection
+                    features = sentence_features(sentence_text)
+                    
                     # Determine difficulty based on sentence length
-                    length = len(sentence_text.split())
-                    if length <= 5:
-                        difficulty = 'easy'
-                    elif length <= 12:
-                        difficulty = 'medium'
-                    else:
-                        difficulty = 'hard'
+                    difficulty = sentence_difficulty(features['word_count'])
                     
                     # Create sentence
                     Sentence.objects.create(
                         text=sentence_text,
-                        difficulty=difficulty
+                        difficulty=difficulty,
+                        **features
                     )
                     imported_count += 1
                     
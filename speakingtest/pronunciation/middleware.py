@@ -0,0 +1,139 @@
+"""Admission control for the speech inference endpoint.
+
+Inference is CPU bound, so letting every request in at once only makes all of
+them slow. InferenceAdmissionMiddleware lets at most INFERENCE_MAX_CONCURRENCY
+requests run inference at the same time, keeps at most INFERENCE_MAX_QUEUE
+waiting for a slot, and rate limits each client. Everything else is rejected
+right away with 429 or 503 and a Retry-After header, so the other views stay
+responsive. The limits apply per worker process.
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+
+# Weight of the latest request in the moving average of inference durations
+DURATION_SMOOTHING = 0.2
+
+
+class InferenceAdmissionMiddleware:
+    """Bounded concurrency, queue depth and per-client rate limits for inference."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.paths = tuple(getattr(settings, 'INFERENCE_ADMISSION_PATHS', ['/api/evaluate-pronunciation/']))
+        self.max_concurrency = getattr(settings, 'INFERENCE_MAX_CONCURRENCY', 2)
+        self.max_queue = getattr(settings, 'INFERENCE_MAX_QUEUE', 4)
+        self.queue_timeout = getattr(settings, 'INFERENCE_QUEUE_TIMEOUT', 10.0)
+        self.rate_limit = getattr(settings, 'INFERENCE_RATE_LIMIT', 10)
+        self.rate_window = getattr(settings, 'INFERENCE_RATE_WINDOW', 60)
+        self.trusted_proxies = getattr(settings, 'INFERENCE_TRUSTED_PROXIES', 0)
+        self.cache = caches[getattr(settings, 'INFERENCE_RATE_LIMIT_CACHE', 'default')]
+
+        self.slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.average_duration = None
+
+    def __call__(self, request):
+        if not request.path_info.startswith(self.paths):
+            return self.get_response(request)
+
+        rate_key = self.rate_limit_key(get_client_id(request, self.trusted_proxies))
+        retry_after = self.check_rate_limit(rate_key)
+        if retry_after:
+            return reject('Too many requests, please slow down.', 429, retry_after)
+
+        # Take a free slot right away, otherwise wait in the bounded queue
+        acquired = self.slots.acquire(blocking=False)
+        if not acquired:
+            with self.lock:
+                queue_full = self.waiting >= self.max_queue
+                if not queue_full:
+                    self.waiting += 1
+            if not queue_full:
+                acquired = self.slots.acquire(timeout=self.queue_timeout)
+                with self.lock:
+                    self.waiting -= 1
+            if not acquired:
+                # Shed requests don't count against the client's rate limit
+                self.refund_rate_limit(rate_key)
+                return reject('The server is busy, please try again shortly.', 503, self.retry_after())
+
+        with self.lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.in_flight -= 1
+                self.record_duration(elapsed)
+            self.slots.release()
+
+    def rate_limit_key(self, client_id):
+        window = int(time.time() // self.rate_window)
+        return f'inference-rate:{client_id}:{window}'
+
+    def check_rate_limit(self, key):
+        """Fixed window rate limit, returns the seconds to wait or 0 if allowed."""
+        if self.cache.add(key, 1, self.rate_window):
+            return 0
+        try:
+            count = self.cache.incr(key)
+        except ValueError:
+            # The key expired between add() and incr()
+            self.cache.add(key, 1, self.rate_window)
+            return 0
+        if count > self.rate_limit:
+            return max(1, math.ceil(self.rate_window - time.time() % self.rate_window))
+        return 0
+
+    def refund_rate_limit(self, key):
+        try:
+            self.cache.decr(key)
+        except ValueError:
+            # The window ended in the meantime
+            pass
+
+    def record_duration(self, elapsed):
+        """Update the moving average of the time admitted requests take."""
+        if self.average_duration is None:
+            self.average_duration = elapsed
+        else:
+            self.average_duration += DURATION_SMOOTHING * (elapsed - self.average_duration)
+
+    def retry_after(self):
+        """Estimate the seconds until the queue ahead of a new request is worked off."""
+        with self.lock:
+            backlog = self.in_flight + self.waiting
+            average_duration = self.average_duration
+        if average_duration is None:
+            # No request finished yet, so there is no estimate of its duration
+            return max(1, math.ceil(self.queue_timeout))
+        return max(1, math.ceil(backlog / self.max_concurrency * average_duration))
+
+
+def get_client_id(request, trusted_proxies=0):
+    """Identify the client by IP address.
+
+    X-Forwarded-For is only used behind trusted_proxies proxies. The entry
+    added by the outermost of them is taken, the ones left of it are set by
+    the client and can't be trusted.
+    """
+    if trusted_proxies:
+        forwarded_for = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded_for) >= trusted_proxies:
+            return forwarded_for[-trusted_proxies]
+    return request.META.get('REMOTE_ADDR', 'unknown')
+
+
+def reject(message, status, retry_after):
+    response = JsonResponse({'error': message}, status=status)
+    response['Retry-After'] = str(retry_after)
+    return response
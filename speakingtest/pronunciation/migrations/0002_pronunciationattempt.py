@@ -0,0 +1,26 @@
+# Generated by Django 4.2.20 on 2026-10-19 10:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pronunciation', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PronunciationAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference_text', models.TextField(help_text='The sentence the user tried to pronounce')),
+                ('recognized_text', models.TextField(blank=True, help_text='The speech that was recognized')),
+                ('overall_score', models.PositiveSmallIntegerField()),
+                ('word_scores', models.JSONField(default=dict)),
+                ('server_recognition', models.BooleanField(default=False, help_text='Whether the speech was recognized on the server from the audio data')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 4.2.20 on 2026-10-19 14:37
+
+import re
+
+from django.db import migrations, models
+
+
+# Frozen copy of pronunciation.phonetics as of this migration, so later changes
+# to the live code don't change what the backfill computes
+HARD_PHONEMES = {
+    'th': ('θ', 'ð'),
+    'rl': ('ɹ', 'r', 'l'),
+    'vw': ('v', 'w'),
+}
+
+
+def sentence_features(converter, text):
+    words = re.findall(r"[a-z0-9]+", text.lower().replace("'", "").replace("’", ""))
+
+    phonemes = []
+    for word in words:
+        try:
+            phonemes.extend(converter.trans_list(word))
+        except Exception as e:
+            print(f"Error transliterating word '{word}': {str(e)}")
+
+    features = {
+        'word_count': len(words),
+        'phoneme_count': len(phonemes),
+    }
+    for name, symbols in HARD_PHONEMES.items():
+        features[f'{name}_count'] = sum(1 for phoneme in phonemes if phoneme in symbols)
+    return features
+
+
+def sentence_difficulty(word_count):
+    if word_count <= 5:
+        return 'easy'
+    elif word_count <= 12:
+        return 'medium'
+    return 'hard'
+
+
+def compute_sentence_features(apps, schema_editor):
+    Sentence = apps.get_model('pronunciation', 'Sentence')
+    sentences = list(Sentence.objects.all())
+    if not sentences:
+        return
+
+    import epitran
+    converter = epitran.Epitran('eng-Latn')
+    for sentence in sentences:
+        for name, value in sentence_features(converter, sentence.text).items():
+            setattr(sentence, name, value)
+        # Difficulty was based on split() before, use the same word count as new imports
+        sentence.difficulty = sentence_difficulty(sentence.word_count)
+    Sentence.objects.bulk_update(
+        sentences,
+        ['difficulty', 'word_count', 'phoneme_count', 'th_count', 'rl_count', 'vw_count'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pronunciation', '0002_pronunciationattempt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sentence',
+            name='word_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sentence',
+            name='phoneme_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sentence',
+            name='th_count',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Number of /θ/ and /ð/ sounds'),
+        ),
+        migrations.AddField(
+            model_name='sentence',
+            name='rl_count',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Number of /r/ and /l/ sounds'),
+        ),
+        migrations.AddField(
+            model_name='sentence',
+            name='vw_count',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Number of /v/ and /w/ sounds'),
+        ),
+        migrations.AddIndex(
+            model_name='sentence',
+            index=models.Index(fields=['difficulty', 'word_count'], name='sentence_difficulty_words_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sentence',
+            index=models.Index(fields=['word_count', 'th_count', 'rl_count', 'vw_count'], name='sentence_words_phonemes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sentence',
+            index=models.Index(fields=['th_count', 'word_count'], name='sentence_th_words_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sentence',
+            index=models.Index(fields=['rl_count', 'word_count'], name='sentence_rl_words_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sentence',
+            index=models.Index(fields=['vw_count', 'word_count'], name='sentence_vw_words_idx'),
+        ),
+        migrations.RunPython(compute_sentence_features, migrations.RunPython.noop),
+    ]
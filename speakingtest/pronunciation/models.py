@@ -1,4 +1,73 @@
+import random
+import time
+
 from django.db import models
+from django.utils import timezone
+
+# Candidate ids looked up by Sentence.objects.random_pick() before it shuffles
+# all matching rows instead
+RANDOM_PICK_CANDIDATES = 32
+
+# The smallest and largest Sentence id are cached per process, so random_pick()
+# doesn't query them on every call. The cache is cleared when sentences are saved
+# or deleted and expires after RANDOM_PICK_BOUNDS_TTL seconds for bulk changes.
+RANDOM_PICK_BOUNDS_TTL = 60
+sentence_id_bounds = {}
+
+
+def get_sentence_id_bounds():
+    """Return the (smallest, largest) Sentence id, or None if there are none."""
+    if sentence_id_bounds.get('expires', 0) < time.monotonic():
+        # Separate queries, SQLite only answers a lone MIN or MAX from the index
+        min_id = Sentence.objects.aggregate(min_id=models.Min('id'))['min_id']
+        max_id = Sentence.objects.aggregate(max_id=models.Max('id'))['max_id']
+        sentence_id_bounds['bounds'] = (min_id, max_id) if min_id is not None else None
+        sentence_id_bounds['expires'] = time.monotonic() + RANDOM_PICK_BOUNDS_TTL
+    return sentence_id_bounds['bounds']
+
+
+def clear_sentence_id_bounds(**kwargs):
+    sentence_id_bounds.clear()
+
+
+class SentenceQuerySet(models.QuerySet):
+    """Selection of practice sentences using the indexed feature columns."""
+
+    def targeting(self, phonemes=None, min_words=None, max_words=None):
+        """Filter to sentences containing the given hard phonemes and length band.
+
+        phonemes are keys of pronunciation.phonetics.HARD_PHONEMES such as 'th'.
+        """
+        queryset = self
+        for phoneme in phonemes or []:
+            queryset = queryset.filter(**{f'{phoneme}_count__gte': 1})
+        if min_words is not None:
+            queryset = queryset.filter(word_count__gte=min_words)
+        if max_words is not None:
+            queryset = queryset.filter(word_count__lte=max_words)
+        return queryset
+
+    def random_pick(self, count=1):
+        """Return up to count matching sentences, sampled uniformly at random.
+
+        Random ids from the whole id range of the table are looked up by primary
+        key, and the database picks count of the ones matching the filters, so
+        every matching sentence is equally likely however sparse the matches
+        are. When too few of them match, the filter is selective enough for the
+        database to shuffle all matching rows instead. Only the chosen rows are
+        loaded.
+        """
+        bounds = get_sentence_id_bounds()
+        if bounds is None:
+            return []
+        id_range = range(bounds[0], bounds[1] + 1)
+
+        candidates = random.sample(id_range, min(len(id_range), max(count * 4, RANDOM_PICK_CANDIDATES)))
+        sentences = list(self.filter(id__in=candidates).order_by('?')[:count])
+        if len(sentences) < count and len(candidates) < len(id_range):
+            sentences = list(self.order_by('?')[:count])
+        return sentences
+
 
 class Sentence(models.Model):
     """Model to store English sentences for pronunciation practice."""
@@ -9,6 +78,46 @@ class Sentence(models.Model):
         ('hard', 'Hard'),
     ], default='medium')
     created_at = models.DateTimeField(auto_now_add=True)
+
+    # Features computed at import time by pronunciation.phonetics.sentence_features
+    word_count = models.PositiveSmallIntegerField(default=0)
+    phoneme_count = models.PositiveSmallIntegerField(default=0)
+    th_count = models.PositiveSmallIntegerField(default=0, help_text="Number of /θ/ and /ð/ sounds")
+    rl_count = models.PositiveSmallIntegerField(default=0, help_text="Number of /r/ and /l/ sounds")
+    vw_count = models.PositiveSmallIntegerField(default=0, help_text="Number of /v/ and /w/ sounds")
+
+    objects = SentenceQuerySet.as_manager()
+
+    class Meta:
+        # Every targeting() filter is an index range search, and on SQLite the
+        # index alone answers it since the rowid is part of every index
+        indexes = [
+            models.Index(fields=['difficulty', 'word_count'], name='sentence_difficulty_words_idx'),
+            models.Index(fields=['word_count', 'th_count', 'rl_count', 'vw_count'], name='sentence_words_phonemes_idx'),
+            models.Index(fields=['th_count', 'word_count'], name='sentence_th_words_idx'),
+            models.Index(fields=['rl_count', 'word_count'], name='sentence_rl_words_idx'),
+            models.Index(fields=['vw_count', 'word_count'], name='sentence_vw_words_idx'),
+        ]
     
     def __str__(self):
         return self.text[:50] + '...' if len(self.text) > 50 else self.text
+
+
+class PronunciationAttempt(models.Model):
+    """Model to store the result of a pronunciation evaluation.
+
+    Attempts are written in batches by pronunciation.attempts, so created_at
+    is set when the attempt is recorded rather than when the row is inserted.
+    """
+    reference_text = models.TextField(help_text="The sentence the user tried to pronounce")
+    recognized_text = models.TextField(blank=True, help_text="The speech that was recognized")
+    overall_score = models.PositiveSmallIntegerField()
+    word_scores = models.JSONField(default=dict)
+    server_recognition = models.BooleanField(
+        default=False,
+        help_text="Whether the speech was recognized on the server from the audio data",
+    )
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f'{self.overall_score} - {self.reference_text[:50]}'
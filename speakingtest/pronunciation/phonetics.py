@@ -0,0 +1,49 @@
+"""Phonetic features of practice sentences.
+
+The features are computed once when sentences are imported and stored on the
+Sentence model, so that sentences can be selected by length and by the hard
+phonemes they contain with indexed queries.
+"""
+import re
+
+import epitran
+
+# Phonemes learners commonly struggle with, grouped by the feature they count
+HARD_PHONEMES = {
+    'th': ('θ', 'ð'),
+    'rl': ('ɹ', 'r', 'l'),
+    'vw': ('v', 'w'),
+}
+
+# English grapheme-to-phoneme converter, shared with the evaluation in views
+epitran_converter = epitran.Epitran('eng-Latn')
+
+
+def sentence_features(text):
+    """Return the word count, phoneme count and hard phoneme counts of a sentence."""
+    # Apostrophes are dropped like clean_text in views does, other punctuation splits words
+    words = re.findall(r"[a-z0-9]+", text.lower().replace("'", "").replace("’", ""))
+
+    phonemes = []
+    for word in words:
+        try:
+            phonemes.extend(epitran_converter.trans_list(word))
+        except Exception as e:
+            print(f"Error transliterating word '{word}': {str(e)}")
+
+    features = {
+        'word_count': len(words),
+        'phoneme_count': len(phonemes),
+    }
+    for name, symbols in HARD_PHONEMES.items():
+        features[f'{name}_count'] = sum(1 for phoneme in phonemes if phoneme in symbols)
+    return features
+
+
+def sentence_difficulty(word_count):
+    """Return the difficulty of a sentence from its word count in sentence_features()."""
+    if word_count <= 5:
+        return 'easy'
+    elif word_count <= 12:
+        return 'medium'
+    return 'hard'
@@ -0,0 +1,143 @@
+"""Opt-in profiling of single requests.
+
+Profiling is off unless settings.PROFILING_ENABLED is set. A request is then
+profiled when it is picked by PROFILING_SAMPLE_RATE, or when it carries the
+PROFILING_HEADER header and comes from a staff user or sends PROFILING_SECRET
+as the header value. Only one request per process is profiled at a time, so
+the torch operator timings don't mix in other requests; requests arriving
+meanwhile run unprofiled. Each profiled request gets its own directory in
+PROFILING_DIR containing:
+
+- stacks.folded: sampled Python stacks in the collapsed format read by
+  flamegraph.pl, speedscope and inferno
+- cprofile.prof: cProfile statistics, readable with pstats, snakeviz or flameprof
+- torch_trace.json: torch profiler trace, readable with Perfetto or chrome://tracing
+- torch_ops.txt: torch operator timings
+
+Only the newest PROFILING_MAX_RUNS directories are kept.
+"""
+import cProfile
+import functools
+import os
+import random
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+import torch
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+
+
+class StackSampler(threading.Thread):
+    """Sample the Python stack of one thread at a fixed interval."""
+
+    def __init__(self, thread_id, interval=0.005):
+        super().__init__(name='stack-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.finished = threading.Event()
+
+    def run(self):
+        while not self.finished.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.finished.set()
+        self.join()
+
+    def write_folded(self, path):
+        with open(path, 'w', encoding='utf-8') as folded_file:
+            for stack, count in self.stacks.most_common():
+                folded_file.write(f'{stack} {count}\n')
+
+
+profiling_lock = threading.Lock()
+
+
+def should_profile(request):
+    if not getattr(settings, 'PROFILING_ENABLED', False):
+        return False
+    header = request.META.get(getattr(settings, 'PROFILING_HEADER', 'HTTP_X_PROFILE'))
+    if header:
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            return True
+        secret = getattr(settings, 'PROFILING_SECRET', '')
+        if secret and constant_time_compare(header, secret):
+            return True
+    return random.random() < getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+
+
+def enforce_retention(profile_dir, max_runs):
+    """Delete the oldest profile directories beyond max_runs."""
+    runs = sorted(
+        (entry for entry in os.scandir(profile_dir) if entry.is_dir()),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in runs[max_runs:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def profile_request(view):
+    """Decorator profiling the wrapped view when should_profile() allows it."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not should_profile(request) or not profiling_lock.acquire(blocking=False):
+            return view(request, *args, **kwargs)
+        try:
+            return profile_view(view, request, *args, **kwargs)
+        finally:
+            profiling_lock.release()
+    return wrapper
+
+
+def profile_view(view, request, *args, **kwargs):
+    """Run the view under the profilers and write the results."""
+    profile_id = f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}'
+    sampler = StackSampler(threading.get_ident(), getattr(settings, 'PROFILING_INTERVAL', 0.005))
+    profiler = cProfile.Profile()
+    torch_profiler = torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU])
+
+    start = time.perf_counter()
+    sampler.start()
+    try:
+        with torch_profiler:
+            profiler.enable()
+            try:
+                response = view(request, *args, **kwargs)
+            finally:
+                profiler.disable()
+    finally:
+        sampler.stop()
+    elapsed = time.perf_counter() - start
+
+    try:
+        profile_dir = str(getattr(settings, 'PROFILING_DIR', 'profiles'))
+        run_dir = os.path.join(profile_dir, profile_id)
+        os.makedirs(run_dir, exist_ok=True)
+        sampler.write_folded(os.path.join(run_dir, 'stacks.folded'))
+        profiler.dump_stats(os.path.join(run_dir, 'cprofile.prof'))
+        torch_profiler.export_chrome_trace(os.path.join(run_dir, 'torch_trace.json'))
+        with open(os.path.join(run_dir, 'torch_ops.txt'), 'w', encoding='utf-8') as ops_file:
+            ops_file.write(torch_profiler.key_averages().table(sort_by='cpu_time_total', row_limit=50))
+        enforce_retention(profile_dir, getattr(settings, 'PROFILING_MAX_RUNS', 20))
+        print(f"Profiled {request.path} in {elapsed * 1000:.0f} ms: {run_dir}")
+    except Exception as e:
+        print(f"Error writing profile {profile_id}: {str(e)}")
+
+    response['X-Profile-Id'] = profile_id
+    return response
@@ -1,3 +1,577 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import soundfile as sf
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import caches
+from django.db import IntegrityError, OperationalError
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from . import views
+from .attempts import AttemptBuffer
+from .middleware import InferenceAdmissionMiddleware
+from .models import PronunciationAttempt, Sentence, clear_sentence_id_bounds
+from .profiling import enforce_retention, profile_request, profiling_lock, should_profile
+
+
+def make_attempt(score=80):
+    return PronunciationAttempt(
+        reference_text='hello world',
+        recognized_text='hello word',
+        overall_score=score,
+        word_scores={'hello': 100, 'world': 60},
+    )
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+class AttemptBufferFlushTests(TestCase):
+    """Flushing the buffer directly, without the writer thread."""
+
+    def test_flush_writes_in_batches(self):
+        buffer = AttemptBuffer(max_size=2)
+        buffer.pending.extend(make_attempt() for _ in range(5))
+
+        self.assertEqual(buffer.flush(), 5)
+        self.assertEqual(PronunciationAttempt.objects.count(), 5)
+        self.assertEqual(len(buffer.pending), 0)
+
+    def test_bad_rows_are_dropped_and_the_others_saved(self):
+        buffer = AttemptBuffer(max_size=10)
+        buffer.pending.extend([make_attempt(), make_attempt(score=None), make_attempt()])
+
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(len(buffer.pending), 0)
+        self.assertEqual(PronunciationAttempt.objects.count(), 2)
+        self.assertEqual(buffer.retry_delay, 0)
+
+    def test_unavailable_database_loses_nothing(self):
+        buffer = AttemptBuffer(max_size=2, flush_interval=5, max_retry_delay=30)
+        buffer.pending.extend(make_attempt(score) for score in range(5))
+
+        locked = OperationalError('database is locked')
+        with mock.patch.object(PronunciationAttempt.objects, 'bulk_create', side_effect=locked):
+            for _ in range(10):
+                self.assertEqual(buffer.flush(), 0)
+                self.assertEqual(len(buffer.pending), 5)
+
+        # Flushing backed off, doubling up to the maximum delay
+        self.assertEqual(buffer.retry_delay, 30)
+
+        self.assertEqual(buffer.flush(), 5)
+        self.assertEqual(buffer.retry_delay, 0)
+        self.assertEqual(
+            sorted(PronunciationAttempt.objects.values_list('overall_score', flat=True)),
+            [0, 1, 2, 3, 4],
+        )
+
+    def test_database_unavailable_while_saving_one_by_one(self):
+        buffer = AttemptBuffer(max_size=10)
+        buffer.pending.extend([make_attempt(1), make_attempt(score=None), make_attempt(3)])
+        calls = []
+
+        def bulk_create(objs):
+            calls.append(objs)
+            if len(calls) == 1:
+                raise IntegrityError('NOT NULL constraint failed')
+            raise OperationalError('database is locked')
+
+        with mock.patch.object(PronunciationAttempt.objects, 'bulk_create', side_effect=bulk_create):
+            self.assertEqual(buffer.flush(), 0)
+
+        self.assertEqual([a.overall_score for a in buffer.pending], [1, None, 3])
+
+    def test_full_buffer_drops_oldest(self):
+        buffer = AttemptBuffer(max_pending=2)
+        buffer.pending.extend([make_attempt(10), make_attempt(20), make_attempt(30)])
+
+        self.assertEqual([a.overall_score for a in buffer.pending], [20, 30])
+
+
+class AttemptBufferWriterTests(TransactionTestCase):
+    """The writer thread needs real commits to be visible to the test."""
+
+    def setUp(self):
+        self.buffer = None
+
+    def tearDown(self):
+        if self.buffer is not None:
+            self.buffer.stop()
+
+    def test_full_buffer_triggers_flush(self):
+        self.buffer = AttemptBuffer(max_size=3, flush_interval=60)
+        for _ in range(3):
+            self.buffer.add(make_attempt())
+
+        self.assertTrue(wait_for(lambda: PronunciationAttempt.objects.count() == 3))
+
+    def test_interval_triggers_flush(self):
+        self.buffer = AttemptBuffer(max_size=100, flush_interval=0.1)
+        self.buffer.add(make_attempt())
+
+        self.assertTrue(wait_for(lambda: PronunciationAttempt.objects.count() == 1))
+
+    def test_stop_drains_buffer(self):
+        self.buffer = AttemptBuffer(max_size=100, flush_interval=60)
+        self.buffer.add(make_attempt())
+        self.buffer.add(make_attempt())
+
+        self.buffer.stop()
+
+        self.assertEqual(PronunciationAttempt.objects.count(), 2)
+        self.assertFalse(self.buffer.thread.is_alive())
+
+
+@override_settings(
+    INFERENCE_ADMISSION_PATHS=['/api/evaluate-pronunciation/'],
+    INFERENCE_MAX_CONCURRENCY=1,
+    INFERENCE_MAX_QUEUE=0,
+    INFERENCE_QUEUE_TIMEOUT=0.05,
+    INFERENCE_RATE_LIMIT=3,
+    INFERENCE_RATE_WINDOW=60,
+    INFERENCE_RATE_LIMIT_CACHE='ratelimit',
+    INFERENCE_TRUSTED_PROXIES=0,
+)
+class InferenceAdmissionMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        caches['ratelimit'].clear()
+        self.factory = RequestFactory()
+        self.release = threading.Event()
+        self.response = HttpResponse('ok')
+
+    def tearDown(self):
+        self.release.set()
+
+    def evaluate(self, **extra):
+        return self.factory.post('/api/evaluate-pronunciation/', **extra)
+
+    def blocking_view(self, request):
+        # Only inference requests block, like the real evaluation does
+        if request.path == '/api/evaluate-pronunciation/':
+            self.release.wait(5)
+        return self.response
+
+    def occupy_slot(self, middleware, expected_in_flight=1):
+        """Run one request in a thread that holds a slot until released."""
+        thread = threading.Thread(target=middleware, args=(self.evaluate(REMOTE_ADDR=f'10.0.0.{90 + expected_in_flight}'),))
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.release.set)
+        self.assertTrue(wait_for(lambda: middleware.in_flight == expected_in_flight))
+
+    def test_other_paths_pass_through(self):
+        middleware = InferenceAdmissionMiddleware(lambda request: self.response)
+        for _ in range(10):
+            self.assertIs(middleware(self.factory.get('/api/random-sentence/')), self.response)
+            self.assertIs(middleware(self.factory.get('/')), self.response)
+
+    def test_other_paths_pass_through_when_saturated(self):
+        middleware = InferenceAdmissionMiddleware(self.blocking_view)
+        self.occupy_slot(middleware)
+
+        response = middleware(self.factory.get('/api/random-sentence/'))
+
+        self.assertIs(response, self.response)
+
+    def test_rate_limit_returns_429_with_retry_after(self):
+        middleware = InferenceAdmissionMiddleware(lambda request: self.response)
+        statuses = [middleware(self.evaluate(REMOTE_ADDR='10.0.0.1')).status_code for _ in range(3)]
+        response = middleware(self.evaluate(REMOTE_ADDR='10.0.0.1'))
+
+        self.assertEqual(statuses, [200, 200, 200])
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 60)
+        # Other clients are not affected
+        self.assertEqual(middleware(self.evaluate(REMOTE_ADDR='10.0.0.2')).status_code, 200)
+
+    def test_rotating_forwarded_for_does_not_bypass_rate_limit(self):
+        middleware = InferenceAdmissionMiddleware(lambda request: self.response)
+        statuses = [
+            middleware(self.evaluate(REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=f'1.2.3.{i}')).status_code
+            for i in range(4)
+        ]
+
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+    @override_settings(INFERENCE_TRUSTED_PROXIES=1)
+    def test_trusted_proxy_entry_identifies_client(self):
+        middleware = InferenceAdmissionMiddleware(lambda request: self.response)
+        statuses = [
+            middleware(self.evaluate(
+                REMOTE_ADDR='10.0.0.1',
+                HTTP_X_FORWARDED_FOR=f'1.2.3.{i}, 203.0.113.7',
+            )).status_code
+            for i in range(4)
+        ]
+
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+    def test_full_queue_returns_503_without_waiting(self):
+        middleware = InferenceAdmissionMiddleware(self.blocking_view)
+        self.occupy_slot(middleware)
+
+        with mock.patch.object(middleware.slots, 'acquire', wraps=middleware.slots.acquire) as acquire:
+            response = middleware(self.evaluate(REMOTE_ADDR='10.0.0.1'))
+
+        self.assertEqual(response.status_code, 503)
+        acquire.assert_called_once_with(blocking=False)
+        self.assertEqual(middleware.waiting, 0)
+
+    @override_settings(INFERENCE_QUEUE_TIMEOUT=7)
+    def test_retry_after_defaults_to_queue_timeout(self):
+        middleware = InferenceAdmissionMiddleware(self.blocking_view)
+        self.occupy_slot(middleware)
+
+        response = middleware(self.evaluate(REMOTE_ADDR='10.0.0.1'))
+
+        self.assertEqual(response['Retry-After'], '7')
+
+    @override_settings(INFERENCE_MAX_CONCURRENCY=2)
+    def test_retry_after_scales_with_average_duration(self):
+        middleware = InferenceAdmissionMiddleware(self.blocking_view)
+        middleware.record_duration(4.0)
+        middleware.record_duration(9.0)
+        self.assertEqual(middleware.average_duration, 5.0)
+        self.occupy_slot(middleware, expected_in_flight=1)
+        self.occupy_slot(middleware, expected_in_flight=2)
+
+        response = middleware(self.evaluate(REMOTE_ADDR='10.0.0.1'))
+
+        # Two requests in flight on two slots take one average duration
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+
+    def test_shed_requests_do_not_use_rate_limit(self):
+        middleware = InferenceAdmissionMiddleware(self.blocking_view)
+        self.occupy_slot(middleware)
+
+        statuses = [middleware(self.evaluate(REMOTE_ADDR='10.0.0.1')).status_code for _ in range(5)]
+        self.release.set()
+        self.assertTrue(wait_for(lambda: middleware.in_flight == 0))
+        response = middleware(self.evaluate(REMOTE_ADDR='10.0.0.1'))
+
+        self.assertEqual(statuses, [503] * 5)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(INFERENCE_MAX_QUEUE=1)
+    def test_queued_request_times_out_with_503(self):
+        middleware = InferenceAdmissionMiddleware(self.blocking_view)
+        self.occupy_slot(middleware)
+
+        response = middleware(self.evaluate(REMOTE_ADDR='10.0.0.1'))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(middleware.waiting, 0)
+
+    @override_settings(INFERENCE_MAX_QUEUE=1, INFERENCE_QUEUE_TIMEOUT=5)
+    def test_queued_request_runs_when_slot_frees(self):
+        middleware = InferenceAdmissionMiddleware(self.blocking_view)
+        self.occupy_slot(middleware)
+        threading.Timer(0.1, self.release.set).start()
+
+        response = middleware(self.evaluate(REMOTE_ADDR='10.0.0.1'))
+
+        self.assertIs(response, self.response)
+        self.assertEqual(middleware.in_flight, 0)
+
+
+class SentenceSelectionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # 100 sentences with only a few sparse ones matching the filters
+        cls.hard_ids = [2, 3, 4, 90]
+        Sentence.objects.bulk_create([
+            Sentence(
+                id=i,
+                text=f'Sentence {i}',
+                difficulty='hard' if i in cls.hard_ids else 'easy',
+                word_count=i % 20,
+                th_count=1 if i % 3 == 0 else 0,
+            )
+            for i in range(1, 101)
+        ])
+
+    def setUp(self):
+        # bulk_create() doesn't send the signals that clear the cached id bounds
+        clear_sentence_id_bounds()
+
+    def assertUniform(self, counts, ids, draws):
+        self.assertEqual(set(counts), set(ids))
+        expected = draws / len(ids)
+        for sentence_id in ids:
+            self.assertAlmostEqual(counts[sentence_id], expected, delta=expected * 0.25)
+
+    def test_random_pick_is_uniform_for_sparse_matches(self):
+        queryset = Sentence.objects.filter(difficulty='hard')
+        counts = Counter(queryset.random_pick()[0].id for _ in range(1000))
+
+        self.assertUniform(counts, self.hard_ids, 1000)
+
+    def test_random_pick_fallback_is_uniform(self):
+        queryset = Sentence.objects.filter(difficulty='hard')
+        with mock.patch('pronunciation.models.RANDOM_PICK_CANDIDATES', 1):
+            counts = Counter(queryset.random_pick()[0].id for _ in range(1000))
+
+        self.assertUniform(counts, self.hard_ids, 1000)
+
+    def test_random_pick_several_is_a_random_sample(self):
+        queryset = Sentence.objects.filter(difficulty='hard')
+        counts = Counter()
+        for _ in range(500):
+            sentences = queryset.random_pick(2)
+            self.assertEqual(len({s.id for s in sentences}), 2)
+            counts.update(s.id for s in sentences)
+
+        self.assertUniform(counts, self.hard_ids, 1000)
+
+    def test_random_pick_returns_all_matches_when_fewer_than_count(self):
+        sentences = Sentence.objects.filter(difficulty='hard').random_pick(10)
+
+        self.assertEqual(sorted(s.id for s in sentences), self.hard_ids)
+
+    def test_random_pick_without_matches(self):
+        self.assertEqual(Sentence.objects.filter(difficulty='medium').random_pick(), [])
+        Sentence.objects.all().delete()
+        self.assertEqual(Sentence.objects.random_pick(), [])
+
+    def test_random_pick_loads_only_chosen_rows(self):
+        clear_sentence_id_bounds()
+        Sentence.objects.random_pick()  # Fill the id bounds cache
+
+        with self.assertNumQueries(1):
+            sentences = Sentence.objects.filter(difficulty='easy').random_pick(3)
+
+        self.assertEqual(len(sentences), 3)
+
+    def test_saving_a_sentence_makes_it_selectable(self):
+        Sentence.objects.random_pick()  # Fill the id bounds cache
+        sentence = Sentence.objects.create(text='New sentence', difficulty='medium')
+
+        self.assertEqual(Sentence.objects.filter(difficulty='medium').random_pick(), [sentence])
+
+    def test_targeting_filters_phonemes_and_length(self):
+        sentences = Sentence.objects.targeting(['th'], min_words=5, max_words=10)
+
+        self.assertEqual(
+            sorted(s.id for s in sentences),
+            [i for i in range(1, 101) if i % 3 == 0 and 5 <= i % 20 <= 10],
+        )
+
+    def test_random_sentence_404_when_targeting_matches_nothing(self):
+        request = RequestFactory().get('/api/random-sentence/', {'phonemes': 'rl', 'min_words': 50})
+        response = views.get_random_sentence(request)
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_random_sentence_defaults_without_targeting(self):
+        Sentence.objects.all().delete()
+        request = RequestFactory().get('/api/random-sentence/')
+        response = views.get_random_sentence(request)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_select_sentences_empty_when_targeting_matches_nothing(self):
+        request = RequestFactory().get('/api/select-sentences/', {'phonemes': 'rl'})
+        response = views.select_sentences(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['sentences'], [])
+
+    def test_select_sentences_rejects_non_numeric_limit(self):
+        request = RequestFactory().get('/api/select-sentences/', {'limit': 'ten'})
+        response = views.select_sentences(request)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content)['error'], 'limit must be a number')
+
+
+def make_audio_data():
+    buffer = io.BytesIO()
+    sf.write(buffer, np.zeros(1600), 16000, format='WAV')
+    return 'data:audio/wav;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+@override_settings(SPEECH_MODEL_TIERS=[
+    {'name': 'fast', 'model': 'fast-model', 'min_confidence': 0.7, 'min_match': 0.5},
+    {'name': 'base', 'model': 'base-model'},
+])
+class SpeechModelCascadeTests(SimpleTestCase):
+
+    def setUp(self):
+        views.speech_model_stats.clear()
+        self.addCleanup(views.speech_model_stats.clear)
+        patcher = mock.patch.object(views, 'get_speech_model')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def transcribe(self, results, reference_text=None):
+        """Run the cascade with the transcription or exception each tier returns."""
+        def transcribe_audio(audio, tier_name=None):
+            result = results[tier_name]
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        with mock.patch.object(views, 'transcribe_audio', side_effect=transcribe_audio) as transcribe:
+            transcription = views.process_audio_data(make_audio_data(), reference_text)
+        return transcription, [c.args[1] for c in transcribe.call_args_list]
+
+    def test_confident_fast_tier_serves(self):
+        transcription, tiers = self.transcribe({'fast': ('hello world', 0.9)}, 'hello world')
+
+        self.assertEqual(transcription, 'hello world')
+        self.assertEqual(tiers, ['fast'])
+
+    def test_escalates_on_low_confidence(self):
+        transcription, tiers = self.transcribe({
+            'fast': ('hello word', 0.5),
+            'base': ('hello world', 0.9),
+        })
+
+        self.assertEqual(transcription, 'hello world')
+        self.assertEqual(tiers, ['fast', 'base'])
+
+    def test_escalates_on_poor_match_with_reference(self):
+        transcription, tiers = self.transcribe({
+            'fast': ('good morning', 0.9),
+            'base': ('hello world', 0.9),
+        }, 'hello world')
+
+        self.assertEqual(transcription, 'hello world')
+        self.assertEqual(tiers, ['fast', 'base'])
+
+    def test_falls_back_to_earlier_tier_when_later_tier_fails(self):
+        transcription, tiers = self.transcribe({
+            'fast': ('hello word', 0.5),
+            'base': RuntimeError('out of memory'),
+        })
+
+        self.assertEqual(transcription, 'hello word')
+        self.assertEqual(tiers, ['fast', 'base'])
+        stats = views.get_speech_model_stats()
+        self.assertEqual((stats['fast']['served'], stats['fast']['escalated']), (1, 0))
+        self.assertEqual((stats['base']['served'], stats['base']['errors']), (0, 1))
+
+    def test_escalates_when_fast_tier_fails(self):
+        transcription, tiers = self.transcribe({
+            'fast': RuntimeError('out of memory'),
+            'base': ('hello world', 0.9),
+        })
+
+        self.assertEqual(transcription, 'hello world')
+        self.assertEqual(tiers, ['fast', 'base'])
+
+    def test_returns_empty_transcription_when_all_tiers_fail(self):
+        transcription, _ = self.transcribe({
+            'fast': RuntimeError('out of memory'),
+            'base': RuntimeError('out of memory'),
+        })
+
+        self.assertEqual(transcription, '')
+        self.assertEqual(views.get_speech_model_stats()['base']['errors'], 1)
+
+    def test_stats(self):
+        self.transcribe({'fast': ('hello world', 0.9)})
+        self.transcribe({'fast': ('hello world', 0.9)})
+        self.transcribe({'fast': ('hello world', 0.9)})
+        self.transcribe({'fast': ('hello word', 0.5), 'base': ('hello world', 0.9)})
+        self.transcribe({'fast': RuntimeError('out of memory'), 'base': ('hello world', 0.9)})
+
+        stats = views.get_speech_model_stats()
+
+        self.assertEqual(
+            {key: stats['fast'][key] for key in ('requests', 'served', 'escalated', 'errors', 'hit_rate', 'share_of_total')},
+            {'requests': 5, 'served': 3, 'escalated': 1, 'errors': 1, 'hit_rate': 0.6, 'share_of_total': 0.6},
+        )
+        self.assertEqual(
+            {key: stats['base'][key] for key in ('requests', 'served', 'escalated', 'errors', 'hit_rate', 'share_of_total')},
+            {'requests': 2, 'served': 2, 'escalated': 0, 'errors': 0, 'hit_rate': 1.0, 'share_of_total': 0.4},
+        )
+
+    def test_stats_view_requires_staff(self):
+        request = RequestFactory().get('/api/speech-model-stats/')
+        request.user = AnonymousUser()
+        self.assertEqual(views.speech_model_stats_view(request).status_code, 403)
+
+        request.user = User(username='admin', is_staff=True)
+        self.assertEqual(views.speech_model_stats_view(request).status_code, 200)
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SECRET='s3cret', PROFILING_SAMPLE_RATE=0)
+class ProfilingTests(SimpleTestCase):
+
+    def make_request(self, user=None, **headers):
+        request = RequestFactory().get('/api/evaluate-pronunciation/', **headers)
+        request.user = user or AnonymousUser()
+        return request
+
+    def test_anonymous_header_without_secret_is_not_profiled(self):
+        self.assertFalse(should_profile(self.make_request(HTTP_X_PROFILE='1')))
+        self.assertFalse(should_profile(self.make_request(HTTP_X_PROFILE='wrong')))
+
+    def test_staff_header_is_profiled(self):
+        staff = User(username='admin', is_staff=True)
+        self.assertTrue(should_profile(self.make_request(staff, HTTP_X_PROFILE='1')))
+        self.assertFalse(should_profile(self.make_request(staff)))
+
+    def test_header_with_secret_is_profiled(self):
+        self.assertTrue(should_profile(self.make_request(HTTP_X_PROFILE='s3cret')))
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled(self):
+        staff = User(username='admin', is_staff=True)
+        self.assertFalse(should_profile(self.make_request(staff, HTTP_X_PROFILE='s3cret')))
+
+    def test_sampler_stops_when_view_raises(self):
+        @profile_request
+        def failing_view(request):
+            raise RuntimeError('boom')
+
+        with tempfile.TemporaryDirectory() as profile_dir, override_settings(PROFILING_DIR=profile_dir):
+            with self.assertRaises(RuntimeError):
+                failing_view(self.make_request(HTTP_X_PROFILE='s3cret'))
+
+        self.assertFalse([t for t in threading.enumerate() if t.name == 'stack-sampler'])
+        self.assertFalse(profiling_lock.locked())
+
+    def test_profiled_response_is_written(self):
+        @profile_request
+        def view(request):
+            return HttpResponse('ok')
+
+        with tempfile.TemporaryDirectory() as profile_dir, override_settings(PROFILING_DIR=profile_dir):
+            response = view(self.make_request(HTTP_X_PROFILE='s3cret'))
+
+            run_dir = os.path.join(profile_dir, response['X-Profile-Id'])
+            self.assertTrue(os.path.exists(os.path.join(run_dir, 'stacks.folded')))
+            self.assertTrue(os.path.exists(os.path.join(run_dir, 'cprofile.prof')))
+
+    def test_enforce_retention_keeps_newest_runs(self):
+        with tempfile.TemporaryDirectory() as profile_dir:
+            for i in range(5):
+                run_dir = os.path.join(profile_dir, f'run-{i}')
+                os.mkdir(run_dir)
+                os.utime(run_dir, (1000 + i, 1000 + i))
+
+            enforce_retention(profile_dir, 3)
+
+            self.assertEqual(sorted(os.listdir(profile_dir)), ['run-2', 'run-3', 'run-4'])
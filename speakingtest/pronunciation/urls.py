@@ -5,5 +5,7 @@ urlpatterns = [
     path('', views.speech_to_text, name='home'),  # Speech-to-text is now the homepage
     path('old-home/', views.home, name='old_home'),  # Keep the old homepage accessible
     path('api/random-sentence/', views.get_random_sentence, name='random_sentence'),
+    path('api/select-sentences/', views.select_sentences, name='select_sentences'),
     path('api/evaluate-pronunciation/', views.evaluate_pronunciation, name='evaluate_pronunciation'),
+    path('api/speech-model-stats/', views.speech_model_stats_view, name='speech_model_stats'),
 ]
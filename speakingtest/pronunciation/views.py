@@ -1,22 +1,28 @@
 from django.shortcuts import render
 from django.http import JsonResponse
+from django.conf import settings
+from difflib import SequenceMatcher
 import random
 import json
 import base64
 import io
+import threading
+import time
 import numpy as np
 import torch
 import soundfile as sf
-import epitran
 import panphon.distance
 from transformers import Wav2Vec2ForCTC, Wav2Vec2Processor
 from .models import Sentence
+from .attempts import record_attempt
+from .profiling import profile_request
+from .phonetics import HARD_PHONEMES, epitran_converter
 
 def home(request):
     """Home view to display the pronunciation testing interface."""
     # Get a random sentence from the database or provide defaults if none exist
     try:
-        random_sentence = random.choice(Sentence.objects.all())
+        random_sentence = Sentence.objects.random_pick()[0]
         sentence_text = random_sentence.text
     except IndexError:
         # If no sentences in the database yet, provide some defaults
@@ -63,20 +69,23 @@ def get_random_sentence(request):
             
         queryset = queryset.filter(difficulty=difficulty)
     
+    # Optionally target hard phonemes and a length band
     try:
-        # Get count of matching sentences
-        sentence_count = queryset.count()
-        
-        if sentence_count > 0:
-            # Get a random sentence using an efficient method
-            random_index = random.randint(0, sentence_count - 1)
-            random_sentence = queryset[random_index]
-            sentence_text = random_sentence.text
-            difficulty_level = random_sentence.difficulty
-        else:
-            # Fallback if no sentences match the filter
-            raise IndexError
+        phonemes, min_words, max_words = parse_sentence_targeting(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    targeted = bool(phonemes) or min_words is not None or max_words is not None
+    queryset = queryset.targeting(phonemes, min_words, max_words)
+    
+    try:
+        # Get a random sentence with primary key lookups instead of COUNT and OFFSET
+        random_sentence = queryset.random_pick()[0]
+        sentence_text = random_sentence.text
+        difficulty_level = random_sentence.difficulty
     except IndexError:
+        # The default sentences below don't match a requested target
+        if targeted:
+            return JsonResponse({'error': 'No sentences match the requested phonemes and length'}, status=404)
         # If no sentences in the database yet, provide some defaults
         default_sentences = [
             "The quick brown fox jumps over the lazy dog.",
@@ -93,21 +102,159 @@ def get_random_sentence(request):
         'difficulty': difficulty_level
     })
 
-# Load the speech recognition model and processor (lazy loading to save memory)
-speech_model = None
-speech_processor = None
-epitran_converter = epitran.Epitran('eng-Latn')
+def select_sentences(request):
+    """API to select sentences targeting hard phonemes and a length band."""
+    try:
+        phonemes, min_words, max_words = parse_sentence_targeting(request)
+        limit = parse_limit(request.GET.get('limit'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    sentences = Sentence.objects.targeting(phonemes, min_words, max_words).random_pick(limit)
+    
+    return JsonResponse({
+        'sentences': [
+            {
+                'sentence': sentence.text,
+                'difficulty': sentence.difficulty,
+                'word_count': sentence.word_count,
+                'phoneme_count': sentence.phoneme_count,
+                'phonemes': {name: getattr(sentence, f'{name}_count') for name in HARD_PHONEMES},
+            }
+            for sentence in sentences
+        ]
+    })
+
+def parse_limit(value, default=10, maximum=50):
+    """Read the limit query param, clamped between 1 and maximum.
+    
+    Raises ValueError if it is not a number.
+    """
+    if not value:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('limit must be a number')
+    return max(1, min(limit, maximum))
+
+def parse_sentence_targeting(request):
+    """Read the phonemes, min_words and max_words query params.
+    
+    phonemes is a comma separated list of keys of HARD_PHONEMES, e.g. 'th,rl'.
+    Raises ValueError for unknown phonemes or non-numeric word counts.
+    """
+    phonemes = [p.strip().lower() for p in request.GET.get('phonemes', '').split(',') if p.strip()]
+    unknown = [p for p in phonemes if p not in HARD_PHONEMES]
+    if unknown:
+        raise ValueError(f"Unknown phonemes: {', '.join(unknown)}. Use {', '.join(HARD_PHONEMES)}")
+    
+    try:
+        min_words = int(request.GET['min_words']) if request.GET.get('min_words') else None
+        max_words = int(request.GET['max_words']) if request.GET.get('max_words') else None
+    except ValueError:
+        raise ValueError('min_words and max_words must be numbers')
+    
+    return phonemes, min_words, max_words
+
+# Load the speech recognition models and processors (lazy loading to save memory).
+# Models are kept per tier of the cascade configured in settings.SPEECH_MODEL_TIERS.
+speech_models = {}
+speech_model_lock = threading.Lock()
+speech_model_stats = {}
+speech_model_stats_lock = threading.Lock()
 phon_distance = panphon.distance.Distance()
 
-def get_speech_model():
-    """Lazy loading of the speech recognition model"""
-    global speech_model, speech_processor
-    if speech_model is None:
-        # Load pre-trained model for English speech recognition
-        speech_processor = Wav2Vec2Processor.from_pretrained("facebook/wav2vec2-base-960h")
-        speech_model = Wav2Vec2ForCTC.from_pretrained("facebook/wav2vec2-base-960h")
-    return speech_model, speech_processor
+DEFAULT_SPEECH_MODEL_TIERS = [
+    {'name': 'base', 'model': 'facebook/wav2vec2-base-960h'},
+]
+
+def get_speech_model_tiers():
+    """Return the configured model cascade, ordered from fastest to most accurate."""
+    return getattr(settings, 'SPEECH_MODEL_TIERS', None) or DEFAULT_SPEECH_MODEL_TIERS
+
+def get_speech_model(tier_name=None):
+    """Lazy loading of the speech recognition model for a cascade tier.
+
+    Without a tier name the last (most accurate) tier is returned, which is
+    what the single-model setup used to load.
+    """
+    tiers = get_speech_model_tiers()
+    if tier_name is None:
+        tier = tiers[-1]
+    else:
+        tier = next((t for t in tiers if t['name'] == tier_name), None)
+        if tier is None:
+            raise KeyError(f"Unknown speech model tier: {tier_name}")
+
+    if tier['name'] not in speech_models:
+        with speech_model_lock:
+            if tier['name'] not in speech_models:
+                processor = Wav2Vec2Processor.from_pretrained(tier['model'])
+                model = Wav2Vec2ForCTC.from_pretrained(tier['model'])
+                model.eval()
+                if tier.get('quantize'):
+                    # Dynamic int8 quantization of the linear layers makes CPU
+                    # inference noticeably faster at a small accuracy cost
+                    model = torch.quantization.quantize_dynamic(
+                        model, {torch.nn.Linear}, dtype=torch.qint8
+                    )
+                speech_models[tier['name']] = (model, processor)
+    return speech_models[tier['name']]
 
+def record_speech_model_stats(tier_name, elapsed=0.0, escalated=False, error=False):
+    """Record one inference run of a tier for the hit rate and latency stats.
+
+    A run that raised counts as an error and not towards the latency.
+    """
+    with speech_model_stats_lock:
+        stats = speech_model_stats.setdefault(tier_name, {
+            'requests': 0,
+            'served': 0,
+            'escalated': 0,
+            'errors': 0,
+            'total_latency': 0.0,
+        })
+        stats['requests'] += 1
+        if error:
+            stats['errors'] += 1
+            return
+        stats['total_latency'] += elapsed
+        if escalated:
+            stats['escalated'] += 1
+        else:
+            stats['served'] += 1
+
+def get_speech_model_stats():
+    """Return per-tier hit rates, error counts and average latency of the model cascade."""
+    with speech_model_stats_lock:
+        total_served = sum(s['served'] for s in speech_model_stats.values())
+        result = {}
+        for tier in get_speech_model_tiers():
+            stats = speech_model_stats.get(tier['name'])
+            if not stats:
+                continue
+            completed = stats['requests'] - stats['errors']
+            result[tier['name']] = {
+                'requests': stats['requests'],
+                'served': stats['served'],
+                'escalated': stats['escalated'],
+                'errors': stats['errors'],
+                'hit_rate': round(stats['served'] / stats['requests'], 4),
+                'share_of_total': round(stats['served'] / total_served, 4) if total_served else 0,
+                'avg_latency_ms': round(stats['total_latency'] / completed * 1000, 2) if completed else 0,
+            }
+        return result
+
+def speech_model_stats_view(request):
+    """API exposing the model cascade statistics of this worker process to staff users."""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Staff access required'}, status=403)
+    return JsonResponse({
+        'tiers': get_speech_model_stats(),
+    })
+
+@profile_request
 def evaluate_pronunciation(request):
     """API to evaluate the user's pronunciation using speech recognition and phonetic analysis."""
     if request.method == 'POST':
@@ -118,6 +265,7 @@ def evaluate_pronunciation(request):
             user_speech = data.get('speech', '')
             audio_data = data.get('audio_data', None)
             reference_text = data.get('reference', '')
+            server_recognition = False
             
             if not reference_text:
                 return JsonResponse({'error': 'Reference text is required'}, status=400)
@@ -127,9 +275,10 @@ def evaluate_pronunciation(request):
                 # Try to process the audio data directly
                 try:
                     # Process the audio to get the transcription
-                    processed_speech = process_audio_data(audio_data)
+                    processed_speech = process_audio_data(audio_data, reference_text)
                     if processed_speech and len(processed_speech) > 0:
                         user_speech = processed_speech
+                        server_recognition = True
                         print(f"Using server-side speech recognition: '{user_speech}'")
                 except Exception as e:
                     print(f"Error processing audio: {str(e)}")
@@ -145,6 +294,9 @@ def evaluate_pronunciation(request):
                 # Use the recognized speech to evaluate pronunciation
                 score, word_scores = real_pronunciation_evaluation(user_speech, reference_text)
             
+            # Keep the attempt for the history, it is written in the background
+            record_attempt(reference_text, user_speech, score, word_scores, server_recognition)
+            
             return JsonResponse({
                 'overall_score': score,
                 'word_scores': word_scores,
@@ -261,10 +413,11 @@ def simulate_pronunciation_with_errors(word):
     
     return simulated_word
 
-def process_audio_data(audio_data):
+def process_audio_data(audio_data, reference_text=None):
     """Process the audio data for speech recognition.
     
-    This function would be used in a full implementation with real audio data.
+    When a reference text is given, the model cascade also escalates if the
+    transcription of a fast tier matches it poorly.
     """
     try:
         # Decode base64 audio data
@@ -278,19 +431,47 @@ def process_audio_data(audio_data):
             # In a full implementation, you would resample here
             pass
         
-        # Get the model and processor
-        model, processor = get_speech_model()
-        
-        # Process the audio data
-        input_values = processor(audio, sampling_rate=16000, return_tensors="pt").input_values
-        
-        # Get the logits
-        with torch.no_grad():
-            logits = model(input_values).logits
-        
-        # Take argmax and decode
-        predicted_ids = torch.argmax(logits, dim=-1)
-        transcription = processor.batch_decode(predicted_ids)[0]
+        # Run the cascade: the fastest tier goes first and we only escalate to
+        # the next one when it is not confident enough about its transcription
+        tiers = get_speech_model_tiers()
+        transcription = ""
+        served_by = None
+        runs = []
+        for index, tier in enumerate(tiers):
+            is_last = index == len(tiers) - 1
+            try:
+                # Load the model first so loading time doesn't count as latency
+                get_speech_model(tier['name'])
+                start = time.perf_counter()
+                tier_transcription, confidence = transcribe_audio(audio, tier['name'])
+                elapsed = time.perf_counter() - start
+            except Exception as e:
+                # A failing tier escalates, an earlier transcription is kept as fallback
+                print(f"Error in speech model tier '{tier['name']}': {str(e)}")
+                record_speech_model_stats(tier['name'], error=True)
+                if is_last and served_by is None:
+                    raise
+                continue
+            transcription = tier_transcription
+            served_by = tier['name']
+            runs.append((tier['name'], elapsed))
+
+            escalate = False
+            if not is_last:
+                if confidence < tier.get('min_confidence', 0):
+                    escalate = True
+                elif reference_text and tier.get('min_match'):
+                    match = SequenceMatcher(None, clean_text(transcription), clean_text(reference_text)).ratio()
+                    escalate = match < tier['min_match']
+
+            if not escalate:
+                break
+            print(f"Escalating from speech model tier '{tier['name']}' (confidence {confidence:.2f})")
+
+        # Only now we know which tier's transcription is used: an escalated
+        # tier still serves the request when every tier after it failed
+        for tier_name, elapsed in runs:
+            record_speech_model_stats(tier_name, elapsed, escalated=tier_name != served_by)
         
         return transcription
     except Exception as e:
@@ -298,6 +479,36 @@ def process_audio_data(audio_data):
         return ""
 
 
+def transcribe_audio(audio, tier_name=None):
+    """Transcribe audio with the model of one tier.
+
+    Returns the transcription and the model confidence, which is the mean of
+    the highest posterior probability over the frames that are not CTC blanks.
+    """
+    model, processor = get_speech_model(tier_name)
+    
+    # Process the audio data
+    input_values = processor(audio, sampling_rate=16000, return_tensors="pt").input_values
+    
+    # Get the logits
+    with torch.no_grad():
+        logits = model(input_values).logits
+    
+    # Take argmax and decode
+    probabilities = torch.softmax(logits, dim=-1)
+    max_probabilities, predicted_ids = torch.max(probabilities, dim=-1)
+    transcription = processor.batch_decode(predicted_ids)[0]
+    
+    # Blank frames are usually very confident and would hide uncertain words
+    speech_frames = predicted_ids[0] != processor.tokenizer.pad_token_id
+    if speech_frames.any():
+        confidence = max_probabilities[0][speech_frames].mean().item()
+    else:
+        confidence = 0.0
+    
+    return transcription, confidence
+
+
 def real_pronunciation_evaluation(user_speech, reference_text):
     """Evaluate pronunciation using actual speech recognition results.
     
@@ -368,8 +579,6 @@ def find_similar_words(target, word_list, threshold=0.6):
     
     Returns a list of (word, similarity_score) tuples, sorted by similarity.
     """
-    from difflib import SequenceMatcher
-    
     similarities = []
     for word in word_list:
         similarity = SequenceMatcher(None, target, word).ratio()
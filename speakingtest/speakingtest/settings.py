@@ -53,6 +53,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For static files in production
+    'pronunciation.middleware.InferenceAdmissionMiddleware',  # Shed load before any other work
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -89,10 +90,30 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests (and in the attempt writer thread)
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'ratelimit': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'inference-ratelimit',
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -140,3 +161,68 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Speech recognition model cascade
+# Tiers run from fastest to most accurate. A tier escalates to the next one when
+# the mean posterior confidence of its transcription is below min_confidence, or
+# when its match against the reference sentence is below min_match. The last
+# tier always answers. "quantize" loads the model with dynamic int8 quantization.
+# Only the base model runs by default. Set SPEECH_MODEL_FAST to a smaller CTC
+# checkpoint to put a fast tier in front of it.
+
+SPEECH_MODEL_TIERS = [
+    {
+        'name': 'base',
+        'model': 'facebook/wav2vec2-base-960h',
+    },
+]
+
+if os.environ.get('SPEECH_MODEL_FAST'):
+    SPEECH_MODEL_TIERS.insert(0, {
+        'name': 'fast',
+        'model': os.environ['SPEECH_MODEL_FAST'],
+        'quantize': os.environ.get('SPEECH_MODEL_FAST_QUANTIZE', '') == 'True',
+        'min_confidence': 0.7,
+        'min_match': 0.5,
+    })
+
+
+# Admission control for speech inference (per worker process)
+# At most INFERENCE_MAX_CONCURRENCY requests run inference at once and at most
+# INFERENCE_MAX_QUEUE wait up to INFERENCE_QUEUE_TIMEOUT seconds for a slot;
+# the rest get a 503. Each client may send INFERENCE_RATE_LIMIT requests per
+# INFERENCE_RATE_WINDOW seconds before getting a 429. Clients are identified by
+# REMOTE_ADDR, or by X-Forwarded-For when INFERENCE_TRUSTED_PROXIES proxies in
+# front of the app append to it (1 on Heroku).
+
+INFERENCE_ADMISSION_PATHS = ['/api/evaluate-pronunciation/']
+INFERENCE_MAX_CONCURRENCY = int(os.environ.get('INFERENCE_MAX_CONCURRENCY', 2))
+INFERENCE_MAX_QUEUE = int(os.environ.get('INFERENCE_MAX_QUEUE', 4))
+INFERENCE_QUEUE_TIMEOUT = 10.0
+INFERENCE_RATE_LIMIT = 10
+INFERENCE_RATE_WINDOW = 60
+INFERENCE_RATE_LIMIT_CACHE = 'ratelimit'
+INFERENCE_TRUSTED_PROXIES = int(os.environ.get('INFERENCE_TRUSTED_PROXIES', 0))
+
+# Pronunciation attempt history
+# Attempts are buffered in memory and written in batches by a background thread,
+# when ATTEMPT_BUFFER_SIZE attempts are waiting or every ATTEMPT_FLUSH_INTERVAL seconds.
+
+ATTEMPT_BUFFER_SIZE = 50
+ATTEMPT_FLUSH_INTERVAL = 5.0
+
+
+# Request profiling
+# When enabled, evaluate_pronunciation is profiled for a PROFILING_SAMPLE_RATE
+# fraction of all requests, and for requests sending the X-Profile header from
+# a staff user or with PROFILING_SECRET as its value.
+# Results are written to PROFILING_DIR, keeping the newest PROFILING_MAX_RUNS.
+
+PROFILING_ENABLED = os.environ.get('DJANGO_PROFILING', '') == 'True'
+PROFILING_HEADER = 'HTTP_X_PROFILE'
+PROFILING_SECRET = os.environ.get('DJANGO_PROFILING_SECRET', '')
+PROFILING_SAMPLE_RATE = float(os.environ.get('DJANGO_PROFILING_SAMPLE_RATE', 0.0))
+PROFILING_INTERVAL = 0.005
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_MAX_RUNS = 20